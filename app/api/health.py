@@ -1,7 +1,7 @@
 import os
 from datetime import datetime
+from functools import lru_cache
 
-import tensorflow as tf
 from fastapi import APIRouter
 
 from app.schemas.responses import HealthResponse, InfoResponse
@@ -9,10 +9,29 @@ from app.schemas.responses import HealthResponse, InfoResponse
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def _load_model_info(model_path: str, mtime: float) -> dict:
+    """Load the model once and cache its metadata.
+
+    Keyed on (path, mtime) so a model-file update invalidates the cache.
+    """
+    # TensorFlow is imported lazily so /health pings and uvicorn startup
+    # do not pay the multi-second TF import
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    return {
+        "model_summary": str(model.summary(print_fn=lambda x: None)),
+        "total_params": model.count_params(),
+    }
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health():
     """API Health Endpoint"""
-    return HealthResponse(
+    # model_construct skips field validation; the values are built here
+    # from literals and FastAPI still validates against response_model
+    return HealthResponse.model_construct(
         status="healthy",
         message="Service is operational",
         timestamp=datetime.now().isoformat(),
@@ -38,13 +57,13 @@ async def info():
 
     if model_exists:
         try:
-            model = tf.keras.models.load_model(model_path, compile=False)
-            model_info["model_summary"] = str(model.summary(print_fn=lambda x: None))
-            model_info["total_params"] = model.count_params()
+            model_info.update(
+                _load_model_info(model_path, os.path.getmtime(model_path))
+            )
         except Exception as e:
             model_info["error"] = str(e)
 
-    return InfoResponse(
+    return InfoResponse.model_construct(
         name="Cityscapes Semantic Segmentation API",
         version="1.0.0",
         description=(
@@ -56,5 +75,6 @@ async def info():
             "GET /health - Health check",
             "GET /info - API information",
             "POST /segment - Image segmentation",
+            "POST /segment-batch - Image segmentation for several images",
         ],
     )
@@ -1,18 +1,54 @@
-import io
+import asyncio
+import base64
+import json
 import time
+from typing import List
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import ORJSONResponse, Response
 
-from app.schemas.responses import SegmentationResponse
+from app.schemas.responses import (
+    BatchItemResult,
+    BatchSegmentationResponse,
+    SegmentationResponse,
+)
 from app.services.segmentation_service import SegmentationService
+from app.services.segmentation_service import service as segmentation_service
 
 router = APIRouter()
-segmentation_service = SegmentationService()
+
+# Limite de taille pour le header X-Image-Stats (les proxies/serveurs
+# rejettent souvent les headers au-delà de ~8 Ko)
+_STATS_HEADER_MAX_BYTES = 4096
+
+
+def _stats_header(stats: dict) -> str:
+    """Sérialise les statistiques en JSON compact pour le header.
+
+    str(stats) produisait une repr Python non parsable côté client; les
+    payloads trop gros sont remplacés par un renvoi vers l'endpoint
+    /segment-with-stats.
+    """
+    payload = json.dumps(stats, separators=(",", ":"))
+    if len(payload) > _STATS_HEADER_MAX_BYTES:
+        return json.dumps(
+            {"detail": "stats too large, use /api/segment-with-stats"},
+            separators=(",", ":"),
+        )
+    return payload
+
+
+def get_service() -> SegmentationService:
+    """Retourne l'instance partagée du service de segmentation"""
+    return segmentation_service
 
 
 @router.post("/segment")
-async def segment_image(file: UploadFile = File(...)):
+async def segment_image(
+    request: Request,
+    file: UploadFile = File(...),
+    service: SegmentationService = Depends(get_service),
+):
     """API Image Segmentation Endpoint"""
     # check if file is an image
     if not file.content_type.startswith("image/"):
@@ -23,20 +59,32 @@ async def segment_image(file: UploadFile = File(...)):
         img_bytes = await file.read()
 
         # measure processing time
-        start_time = time.time()
-
-        # perform segmentation
-        segmented_image_bytes, stats = segmentation_service.segment_image(img_bytes)
-
-        processing_time = time.time() - start_time
-
-        # return segmented image
-        return StreamingResponse(
-            io.BytesIO(segmented_image_bytes),
+        start_time = time.perf_counter()
+
+        # perform segmentation (batched across concurrent requests when the
+        # micro-batching queue is running)
+        batch_queue = getattr(request.app.state, "batch_queue", None)
+        if batch_queue is not None:
+            segmented_image_bytes, stats = await service.segment_image_batched(
+                img_bytes, batch_queue
+            )
+        else:
+            # run the blocking CPU/GPU work off the event loop so concurrent
+            # requests are not serialized behind it
+            segmented_image_bytes, stats = await asyncio.to_thread(
+                service.segment_image, img_bytes
+            )
+
+        processing_time = time.perf_counter() - start_time
+
+        # return segmented image (already fully in memory, so a plain
+        # Response avoids the BytesIO copy and the streaming state machine)
+        return Response(
+            content=segmented_image_bytes,
             media_type="image/png",
             headers={
                 "X-Processing-Time": f"{processing_time:.3f}s",
-                "X-Image-Stats": str(stats),
+                "X-Image-Stats": _stats_header(stats),
             },
         )
 
@@ -46,8 +94,83 @@ async def segment_image(file: UploadFile = File(...)):
         )
 
 
+# ORJSONResponse sérialise le contenu validé via orjson (notablement
+# plus rapide que json.dumps sur un batch de stats + images base64)
+@router.post(
+    "/segment-batch",
+    response_model=BatchSegmentationResponse,
+    response_class=ORJSONResponse,
+)
+async def segment_image_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    service: SegmentationService = Depends(get_service),
+):
+    """API Image Segmentation Endpoint for several images in one request.
+
+    Amortizes per-request routing, multipart parsing and middleware cost
+    over the whole batch instead of paying it once per image.
+    """
+    # check if all files are images before doing any work
+    for file in files:
+        if not file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="File must be an image")
+
+    try:
+        # read all files
+        payloads = [await file.read() for file in files]
+
+        # measure processing time
+        start_time = time.perf_counter()
+
+        # perform segmentation (batched across images when the
+        # micro-batching queue is running)
+        batch_queue = getattr(request.app.state, "batch_queue", None)
+        if batch_queue is not None:
+            outputs = await asyncio.gather(
+                *[
+                    service.segment_image_batched(img_bytes, batch_queue)
+                    for img_bytes in payloads
+                ]
+            )
+        else:
+            # run the blocking CPU/GPU work off the event loop so the
+            # images are processed without serializing behind it
+            outputs = await asyncio.gather(
+                *[
+                    asyncio.to_thread(service.segment_image, img_bytes)
+                    for img_bytes in payloads
+                ]
+            )
+
+        processing_time = time.perf_counter() - start_time
+
+        return BatchSegmentationResponse(
+            message="Segmentation performed successfully",
+            results=[
+                BatchItemResult(
+                    image=base64.b64encode(segmented_image_bytes).decode("ascii"),
+                    stats=stats,
+                )
+                for segmented_image_bytes, stats in outputs
+            ],
+            processing_time=processing_time,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error during segmentation: {str(e)}"
+        )
+
+
 @router.post("/segment-with-stats")
-async def segment_image_with_stats(file: UploadFile = File(...)):
+async def segment_image_with_stats(
+    request: Request,
+    file: UploadFile = File(...),
+    service: SegmentationService = Depends(get_service),
+):
     """API Image Segmentation Endpoint with detailed statistics"""
     # check if file is an image
     if not file.content_type.startswith("image/"):
@@ -58,22 +181,34 @@ async def segment_image_with_stats(file: UploadFile = File(...)):
         img_bytes = await file.read()
 
         # measure processing time
-        start_time = time.time()
-
-        # perform segmentation
-        segmented_image_bytes, stats = segmentation_service.segment_image(img_bytes)
-
-        processing_time = time.time() - start_time
-
-        # create response with statistics
+        start_time = time.perf_counter()
+
+        # perform segmentation (batched across concurrent requests when the
+        # micro-batching queue is running)
+        batch_queue = getattr(request.app.state, "batch_queue", None)
+        if batch_queue is not None:
+            segmented_image_bytes, stats = await service.segment_image_batched(
+                img_bytes, batch_queue
+            )
+        else:
+            # run the blocking CPU/GPU work off the event loop so concurrent
+            # requests are not serialized behind it
+            segmented_image_bytes, stats = await asyncio.to_thread(
+                service.segment_image, img_bytes
+            )
+
+        processing_time = time.perf_counter() - start_time
+
+        # create response with statistics; the validated model is dumped
+        # once and encodé par orjson, sans repasser par jsonable_encoder
         response = SegmentationResponse(
             message="Segmentation performed successfully",
             stats=stats,
-            image_size=segmentation_service.IMG_SIZE,
+            image_size=service.IMG_SIZE,
             processing_time=processing_time,
         )
 
-        return response
+        return ORJSONResponse(response.model_dump(mode="json"))
 
     except Exception as e:
         raise HTTPException(
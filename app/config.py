@@ -13,11 +13,16 @@ class Settings:
     )
     API_VERSION = "1.0.0"
 
-    # Configuration du modèle
-    MODEL_PATH = "model/V3_unet_best.keras"
+    # Configuration du modèle. Surchargable via MODEL_PATH pour pointer un
+    # Lambda layer (/opt/model/...) ou un montage EFS (/mnt/model/...) :
+    # le fichier est alors déjà local et le download S3 du cold start saute
+    MODEL_PATH = os.getenv("MODEL_PATH", "model/V3_unet_best.keras")
     N_CLASSES = 8
     IMG_SIZE = (256, 512)
 
+    # Jeu d'images Cityscapes prétraitées pour la calibration INT8 TensorRT
+    CALIBRATION_DATA_DIR = os.getenv("CALIBRATION_DATA_DIR", "model/calibration")
+
     # Palette de couleurs pour la segmentation
     PALETTE = [
         [128, 64, 128],  # road
@@ -48,20 +53,19 @@ class Settings:
     # Configuration du serveur
     HOST = os.getenv("HOST", "0.0.0.0")
 
-    @property
-    def PORT(self) -> int:
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+    def __init__(self):
+        # PORT et RELOAD sont lus et parsés une seule fois à la construction
+        # plutôt qu'à chaque accès via des properties
         port_str = os.getenv("PORT", "8000")
         try:
-            return int(port_str)
+            self.PORT = int(port_str)
         except ValueError:
             raise ValueError(f"Invalid PORT value: {port_str}")
 
-    @property
-    def RELOAD(self) -> bool:
         reload_str = os.getenv("RELOAD", "true")
-        return reload_str.lower() in ("true", "1", "yes", "on")
-
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+        self.RELOAD = reload_str.lower() in ("true", "1", "yes", "on")
 
 
 # Instance globale des paramètres
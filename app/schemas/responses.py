@@ -1,6 +1,18 @@
-from typing import Any, Dict
+from typing import Any, Dict, NamedTuple
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PositiveInt
+
+
+class ImageSize(NamedTuple):
+    """(height, width) of the segmented image.
+
+    Validated as a fixed two-field NamedTuple: PositiveInt on each
+    field replaces the per-element loop plus custom validator that a
+    plain tuple[int, int] annotation needs.
+    """
+
+    height: PositiveInt
+    width: PositiveInt
 
 
 class HealthResponse(BaseModel):
@@ -22,15 +34,40 @@ class SegmentationStats(BaseModel):
     percentage: float = Field(ge=0.0, le=100.0)
 
 
+class BatchItemResult(BaseModel):
+    image: str  # segmented PNG, base64-encoded
+    stats: Dict[str, SegmentationStats]
+
+
+class BatchSegmentationResponse(BaseModel):
+    message: str
+    results: list[BatchItemResult]
+    processing_time: float = Field(ge=0.0)
+
+
 class SegmentationResponse(BaseModel):
     message: str
     stats: Dict[str, SegmentationStats]
-    image_size: tuple[int, int]
+    image_size: ImageSize
     processing_time: float = Field(ge=0.0)
 
-    @field_validator("image_size")
-    @classmethod
-    def validate_image_size(cls, v):
-        if v[0] <= 0 or v[1] <= 0:
-            raise ValueError("Image size must be positive")
-        return v
+
+# Touch the compiled validator/serializer for each model once at import
+# so the SchemaValidator build cost is paid here instead of on the first
+# request; the bound validate_python fast paths skip the BaseModel
+# __init__ machinery when validating plain dicts.
+for _model in (
+    HealthResponse,
+    InfoResponse,
+    SegmentationStats,
+    BatchItemResult,
+    BatchSegmentationResponse,
+    SegmentationResponse,
+):
+    _model.__pydantic_validator__
+    _model.__pydantic_serializer__
+
+validate_health = HealthResponse.__pydantic_validator__.validate_python
+validate_info = InfoResponse.__pydantic_validator__.validate_python
+validate_segmentation_stats = SegmentationStats.__pydantic_validator__.validate_python
+validate_segmentation = SegmentationResponse.__pydantic_validator__.validate_python
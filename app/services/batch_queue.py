@@ -0,0 +1,80 @@
+# app/services/batch_queue.py
+import asyncio
+from typing import Callable, Sequence
+
+import numpy as np
+
+
+class AsyncBatchQueue:
+    """File d'attente asynchrone de micro-batching pour l'inférence.
+
+    Regroupe jusqu'à `max_batch_size` requêtes concurrentes (ou celles
+    arrivées dans la fenêtre `max_wait_time`) et exécute une seule passe
+    `process_fn` sur le batch empilé. Chaque requête récupère son résultat
+    via une Future.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[np.ndarray], Sequence[np.ndarray]],
+        max_batch_size: int = 8,
+        max_wait_time: float = 0.02,
+    ):
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def start(self):
+        """Lance la tâche de fond qui draine la file"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        """Arrête la tâche de fond"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def add_request(self, tensor: np.ndarray) -> np.ndarray:
+        """Soumet un tenseur prétraité et attend sa prédiction"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((tensor, future))
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Première entrée : attente bloquante
+            batch = [await self._queue.get()]
+
+            # Compléter le batch jusqu'à max_batch_size ou expiration
+            deadline = loop.time() + self.max_wait_time
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            tensors = np.stack([tensor for tensor, _ in batch])
+            try:
+                outputs = await asyncio.to_thread(self.process_fn, tensors)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
@@ -2,20 +2,60 @@
 import os
 
 from app.config import settings
+from app.services import trt_engine
 
 
-def is_model_loaded():
-    """Check if the model file exists and can be loaded"""
+def ensure_model_available():
+    """Télécharge le modèle depuis S3 s'il est absent du filesystem.
+
+    Chemin Lambda : un seul download_file boto3 (pas de `dvc pull`, qui
+    forke un sous-process et parcourt un cache DVC pour un seul fichier).
+    En dev le modèle reste géré par DVC.
+    """
+    if os.path.exists(settings.MODEL_PATH):
+        return True
+
+    bucket = os.getenv("MODEL_S3_BUCKET")
+    key = os.getenv("MODEL_S3_KEY")
+    if not (bucket and key):
+        return False
+
     try:
-        # Check if the model file exists
-        if not os.path.exists(settings.MODEL_PATH):
-            return False
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
 
-        # Try to load the model to verify it's valid
-        import tensorflow as tf
+        client = boto3.client(
+            "s3",
+            config=Config(max_pool_connections=1, retries={"max_attempts": 2}),
+        )
+        model_dir = os.path.dirname(settings.MODEL_PATH)
+        if model_dir:
+            os.makedirs(model_dir, exist_ok=True)
+        client.download_file(
+            bucket,
+            key,
+            settings.MODEL_PATH,
+            Config=TransferConfig(
+                multipart_threshold=64 * 1024 * 1024, max_concurrency=4
+            ),
+        )
+        print(f"Model downloaded from s3://{bucket}/{key}")
+        return True
+    except Exception as e:
+        print(f"Model download from S3 failed: {e}")
+        return False
+
+
+def is_model_loaded():
+    """Check if the model is available without reloading it"""
+    try:
+        # Engine (or fallback Keras model) already cached in memory
+        if trt_engine.is_engine_loaded():
+            return True
 
-        model = tf.keras.models.load_model(settings.MODEL_PATH, compile=False)
-        return model is not None
+        # Otherwise just check that the model file exists on disk
+        return os.path.exists(settings.MODEL_PATH)
     except Exception as e:
         print(f"Model loading check failed: {e}")
         return False
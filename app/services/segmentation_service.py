@@ -1,14 +1,32 @@
 # app/services/segmentation_service.py
-import io
+import asyncio
+import functools
+import logging
 import os
+import threading
 from typing import Tuple
 
 import cv2
 import numpy as np
-import tensorflow as tf
-from PIL import Image
 
 from app.config import settings
+from app.services import trt_engine
+
+logger = logging.getLogger(__name__)
+
+# TensorFlow est importé paresseusement (dans les méthodes qui en ont
+# besoin) : importer ce module — et donc app.main pour un simple ping
+# /health — ne doit pas payer les secondes d'import de TF
+
+
+@functools.lru_cache(maxsize=4)
+def _path_exists_cached(path: str) -> bool:
+    """os.path.exists mémoïsé : un seul stat() par chemin et par process.
+
+    Le fichier modèle ne bouge pas pendant la vie du process; les tests
+    qui patchent os.path.exists vident ce cache via une fixture autouse.
+    """
+    return os.path.exists(path)
 
 # Import boto3 conditionally for AWS Lambda environment
 try:
@@ -17,27 +35,162 @@ try:
 except ImportError:
     BOTO3_AVAILABLE = False
 
+# Numba est optionnel : kernel fusionné argmax+palette quand disponible,
+# fallback NumPy sinon
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fuse_argmax_palette_bgr(out, palette_bgr, ids, color_bgr):
+        """Argmax des logits + lookup palette BGR en un seul passage.
+
+        Fusionne les trois passes mémoire (argmax, indexation palette,
+        conversion RGB->BGR) en une seule lecture des logits et une seule
+        écriture de l'image couleur.
+        """
+        h, w, n_classes = out.shape
+        for y in prange(h):
+            for x in range(w):
+                best = 0
+                best_val = out[y, x, 0]
+                for k in range(1, n_classes):
+                    value = out[y, x, k]
+                    if value > best_val:
+                        best_val = value
+                        best = k
+                ids[y, x] = best
+                color_bgr[y, x, 0] = palette_bgr[best, 0]
+                color_bgr[y, x, 1] = palette_bgr[best, 1]
+                color_bgr[y, x, 2] = palette_bgr[best, 2]
+
+    @njit(parallel=True, cache=True)
+    def _argmax8_u8(words, ids):
+        """Argmax de 8 logits uint8 packés dans un mot uint64 par pixel.
+
+        Pour les sorties quantifiées INT8/UINT8 : une seule lecture de
+        8 octets par pixel puis extraction des lanes par shifts/masques,
+        au lieu de 8 lectures d'octets séparées.
+        """
+        n = words.size
+        for i in prange(n):
+            word = words[i]
+            best = 0
+            best_val = word & 0xFF
+            for k in range(1, 8):
+                value = (word >> (8 * k)) & 0xFF
+                if value > best_val:
+                    best_val = value
+                    best = k
+            ids[i] = best
+
 
 class SegmentationService:
+    # LUT float32 de 256 entrées pour la normalisation uint8 -> [0,1] :
+    # cv2.LUT remplace la multiplication flottante par pixel par un
+    # simple gather dans une table résidente en cache L1
+    _RESCALE_LUT = np.arange(256, dtype=np.float32) / 255.0
+
+    # Configuration immuable partagée entre toutes les instances :
+    # construite une seule fois à l'import, pas à chaque construction
+    # (les fixtures de test instancient le service librement)
+    N_CLASSES = settings.N_CLASSES
+    IMG_SIZE = settings.IMG_SIZE
+    CLASS_NAMES = tuple(settings.CLASS_NAMES)
+    PALETTE = np.array(settings.PALETTE, np.uint8)
+    PALETTE.setflags(write=False)
+    # Palette en ordre BGR pour écrire directement le format attendu
+    # par cv2.imencode sans passe cvtColor; C-contiguë pour le fast
+    # path de np.take, et en lecture seule car partagée
+    PALETTE_BGR = np.ascontiguousarray(PALETTE[:, ::-1])
+    PALETTE_BGR.setflags(write=False)
+
     def __init__(self):
-        self.N_CLASSES = settings.N_CLASSES
-        self.IMG_SIZE = settings.IMG_SIZE
-        self.PALETTE = np.array(settings.PALETTE, np.uint8)
-        self.CLASS_NAMES = settings.CLASS_NAMES
+        # Palette BGR côté TF pour l'argmax + lookup dans le graphe,
+        # construite au chargement du modèle (TF importé lazy)
+        self._palette_bgr_tf = None
         self._model = None
+        self._infer = None
+        self._infer_batch = None
+
+        # Tenseur d'entrée préalloué pour le chemin synchrone : zéro
+        # allocation par requête. Protégé par _infer_lock (le buffer est
+        # partagé, une seule inférence synchrone à la fois).
+        h, w = self.IMG_SIZE
+        self._x = np.empty((1, h, w, 3), np.float32)
+        self._tmp_u8 = np.empty((h, w, 3), np.uint8)
+        self._infer_lock = threading.Lock()
+
+        # Buffers de post-traitement réutilisés entre les requêtes
+        # (argmax ids + masque colorisé), protégés par _post_lock
+        self._ids_buf = np.empty((h, w), np.uint8)
+        self._color_buf = np.empty((h, w, 3), np.uint8)
+        self._post_lock = threading.Lock()
 
     def _check_model_exists(self):
         """Vérifie que le modèle existe dans l'image Docker"""
-        if not os.path.exists(settings.MODEL_PATH):
+        if not _path_exists_cached(settings.MODEL_PATH):
             raise FileNotFoundError(
                 f"Model file not found at {settings.MODEL_PATH}. "
                 "The model should be included in the Docker image."
             )
 
+    def _wrap_keras_model(self):
+        """Construit _infer/_infer_batch si le modèle résolu est Keras.
+
+        Appelé quel que soit le loader qui a fourni le modèle (chargement
+        lazy du service ou fallback Keras de trt_engine au démarrage) :
+        l'appel direct du graphe via tf.function évite le dispatcher
+        Python de model.predict (batching/callbacks) à chaque image.
+        """
+        import sys
+
+        # Si TF n'a jamais été importé, le modèle ne peut pas être Keras
+        # (backend TensorRT pur) : ne pas payer l'import pour le vérifier
+        tf = sys.modules.get("tensorflow")
+        if tf is None or not isinstance(self._model, tf.keras.Model):
+            return
+
+        if self._palette_bgr_tf is None:
+            self._palette_bgr_tf = tf.constant(self.PALETTE_BGR)
+
+        # L'argmax et le lookup palette restent dans le graphe (sur
+        # device quand il y en a un) : un seul transfert H×W×3 uint8
+        # vers l'hôte au lieu des logits H×W×8 float32 suivis de deux
+        # passes CPU
+        def _infer_fn(t):
+            logits = self._model(t, training=False)
+            ids = tf.cast(tf.argmax(logits, axis=-1), tf.uint8)
+            color_bgr = tf.gather(
+                self._palette_bgr_tf, tf.cast(ids, tf.int32)
+            )
+            return ids, color_bgr
+
+        self._infer = tf.function(_infer_fn).get_concrete_function(
+            tf.TensorSpec((1, *self.IMG_SIZE, 3), tf.float32)
+        )
+        # Variante à batch dynamique pour la file de micro-batching
+        self._infer_batch = tf.function(
+            lambda t: self._model(t, training=False)
+        ).get_concrete_function(
+            tf.TensorSpec((None, *self.IMG_SIZE, 3), tf.float32)
+        )
+
     @property
     def model(self):
         """Charge le modèle de manière lazy"""
         if self._model is None:
+            # Réutiliser l'engine partagé chargé au démarrage si disponible
+            if trt_engine.is_engine_loaded():
+                self._model = trt_engine.get_engine()
+                self._wrap_keras_model()
+                return self._model
+
             try:
                 print(f"Loading model from: {settings.MODEL_PATH}")
                 print(f"Model file exists: {os.path.exists(settings.MODEL_PATH)}")
@@ -45,11 +198,16 @@ class SegmentationService:
                 # Vérifier que le modèle existe dans l'image Docker
                 self._check_model_exists()
 
+                # Import lazy : seul le chargement effectif du modèle
+                # paie l'import TensorFlow
+                import tensorflow as tf
+
                 # Load the model
                 self._model = tf.keras.models.load_model(
                     settings.MODEL_PATH, compile=False
                 )
                 print("Model loaded successfully")
+                self._wrap_keras_model()
 
             except Exception as e:
                 print(f"Error loading model: {e}")
@@ -68,113 +226,247 @@ class SegmentationService:
                     raise e
         return self._model
 
+    def warmup(self):
+        """Charge le modèle et exécute une inférence factice.
+
+        Appelé au démarrage pour payer le coût de construction du graphe
+        et d'autotuning avant la première vraie requête.
+        """
+        if not os.path.exists(settings.MODEL_PATH):
+            print("Model file not found, skipping warmup")
+            return
+
+        dummy = np.zeros((1, *self.IMG_SIZE, 3), dtype=np.float32)
+        self.model.predict(dummy)
+        print("Model warmup completed")
+
+    def _resize_and_normalize(self, img_array: np.ndarray) -> np.ndarray:
+        """Resize vers IMG_SIZE et normalisation [0,1] en une seule copie.
+
+        Le resize reste en uint8 (moins de bande passante), puis la
+        normalisation passe par la LUT float32 : un gather par octet au
+        lieu d'un cast + multiplication flottante.
+        """
+        img_resized = cv2.resize(img_array, (self.IMG_SIZE[1], self.IMG_SIZE[0]))
+        return cv2.LUT(img_resized, self._RESCALE_LUT)
+
+    @staticmethod
+    def _probe_dimensions(image_bytes: bytes):
+        """Lit (largeur, hauteur) depuis le header PNG/JPEG sans décoder"""
+        # PNG : dimensions à offset fixe dans le chunk IHDR
+        if image_bytes[:8] == b"\x89PNG\r\n\x1a\n" and len(image_bytes) >= 24:
+            width = int.from_bytes(image_bytes[16:20], "big")
+            height = int.from_bytes(image_bytes[20:24], "big")
+            return width, height
+
+        # JPEG : scanner les marqueurs jusqu'au SOF
+        if image_bytes[:2] == b"\xff\xd8":
+            i = 2
+            n = len(image_bytes)
+            while i + 9 < n:
+                if image_bytes[i] != 0xFF:
+                    break
+                marker = image_bytes[i + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    i += 2
+                    continue
+                length = int.from_bytes(image_bytes[i + 2 : i + 4], "big")
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height = int.from_bytes(image_bytes[i + 5 : i + 7], "big")
+                    width = int.from_bytes(image_bytes[i + 7 : i + 9], "big")
+                    return width, height
+                i += 2 + length
+        return None
+
+    def _decode_rgb(self, image_bytes: bytes) -> np.ndarray:
+        """Décode des bytes image en tableau RGB via cv2.imdecode.
+
+        Pour les grandes images, décode directement à résolution réduite
+        (IMREAD_REDUCED_COLOR_*, DCT scaling libjpeg) au lieu de décoder
+        les mégapixels complets pour les jeter au resize.
+        """
+        flag = cv2.IMREAD_COLOR
+        dims = self._probe_dimensions(image_bytes)
+        if dims is not None:
+            ratio = min(dims[0] / self.IMG_SIZE[1], dims[1] / self.IMG_SIZE[0])
+            if ratio >= 8:
+                flag = cv2.IMREAD_REDUCED_COLOR_8
+            elif ratio >= 4:
+                flag = cv2.IMREAD_REDUCED_COLOR_4
+            elif ratio >= 2:
+                flag = cv2.IMREAD_REDUCED_COLOR_2
+
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        bgr = cv2.imdecode(nparr, flag)
+        if bgr is None:
+            raise ValueError("cv2.imdecode returned None (malformed image)")
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
     def preprocess_image(self, image_bytes: bytes) -> np.ndarray:
-        """Prétraite une image à partir de bytes"""
+        """Prétraite une image à partir de bytes.
+
+        Décode via cv2.imdecode uniquement : un seul décodeur, une seule
+        copie, pas d'objet PIL intermédiaire.
+        """
         try:
-            print(f"Preprocessing image of {len(image_bytes)} bytes")
+            return self._resize_and_normalize(self._decode_rgb(image_bytes))
+        except Exception as e:
+            raise Exception(f"Error preprocessing image: {str(e)}")
 
-            # Try multiple approaches for Lambda compatibility
-            try:
-                # Method 1: Direct PIL approach
-                img = Image.open(io.BytesIO(image_bytes))
-                print(f"Image opened successfully with PIL: {img.size} {img.mode}")
-                img = img.convert("RGB")
-                img_array = np.array(img)
-                print(f"Image converted to array: {img_array.shape}")
-                img_resized = cv2.resize(
-                    img_array, (self.IMG_SIZE[1], self.IMG_SIZE[0])
-                )
-                print(f"Image resized to: {img_resized.shape}")
-                return img_resized.astype(np.float32) / 255.0
-            except Exception as e1:
-                print(f"Method 1 (PIL) failed: {e1}")
-                try:
-                    # Method 2: Convert to numpy first, then to PIL
-                    nparr = np.frombuffer(image_bytes, np.uint8)
-                    img_array = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    if img_array is None:
-                        raise Exception("cv2.imdecode returned None")
-                    print(f"Image decoded with cv2: {img_array.shape}")
-                    img = Image.fromarray(cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB))
-                    print(f"Image converted to PIL: {img.size} {img.mode}")
-                    img = img.convert("RGB")
-                    img_array = np.array(img)
-                    print(f"Image converted to array: {img_array.shape}")
-                    img_resized = cv2.resize(
-                        img_array, (self.IMG_SIZE[1], self.IMG_SIZE[0])
-                    )
-                    print(f"Image resized to: {img_resized.shape}")
-                    return img_resized.astype(np.float32) / 255.0
-                except Exception as e2:
-                    print(f"Method 2 (cv2->PIL) failed: {e2}")
-                    # Method 3: Use cv2 directly
-                    nparr = np.frombuffer(image_bytes, np.uint8)
-                    img_array = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    if img_array is None:
-                        raise Exception("cv2.imdecode returned None")
-                    print(f"Image opened successfully with cv2: {img_array.shape}")
-                    img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
-                    print(f"Image color converted: {img_array.shape}")
-                    img_resized = cv2.resize(
-                        img_array, (self.IMG_SIZE[1], self.IMG_SIZE[0])
-                    )
-                    print(f"Image resized to: {img_resized.shape}")
-                    return img_resized.astype(np.float32) / 255.0
+    def _preprocess_into_input(self, image_bytes: bytes) -> np.ndarray:
+        """Prétraite directement dans le tenseur d'entrée préalloué.
+
+        À appeler sous self._infer_lock : resize dans le buffer uint8 puis
+        normalisation LUT écrite directement dans self._x, sans allocation.
+        """
+        try:
+            rgb = self._decode_rgb(image_bytes)
+            cv2.resize(
+                rgb, (self.IMG_SIZE[1], self.IMG_SIZE[0]), dst=self._tmp_u8
+            )
+            cv2.LUT(self._tmp_u8, self._RESCALE_LUT, dst=self._x[0])
+            return self._x
         except Exception as e:
-            print(f"Error in preprocess_image: {e}")
             raise Exception(f"Error preprocessing image: {str(e)}")
 
     def segment_image(self, image_bytes: bytes) -> Tuple[bytes, dict]:
         """Effectue la segmentation d'une image et retourne le résultat encodé en PNG"""
-        # print("Starting image segmentation...")
-        import logging
-
-        logger = logging.getLogger(__name__)
         logger.info("Starting image segmentation...")
 
-        # Prétraitement
-        print("Preprocessing image...")
-        x = self.preprocess_image(image_bytes)[None, ...]
-        print(f"Preprocessed image shape: {x.shape}")
+        # Le lock protège le tenseur d'entrée partagé et borne à une
+        # inférence synchrone à la fois
+        with self._infer_lock:
+            # Prétraitement
+            x = self._preprocess_into_input(image_bytes)
+            # Prédiction
+            model = self.model
+            if self._infer is not None:
+                # TF est forcément déjà chargé si _infer existe : cet
+                # import est un simple lookup dans sys.modules
+                import tensorflow as tf
+
+                # Argmax + palette déjà appliqués dans le graphe
+                ids_t, color_t = self._infer(tf.constant(x))
+                ids = ids_t[0].numpy()
+                color_bgr = color_t[0].numpy()
+            else:
+                ids = color_bgr = None
+                out = model.predict(x)[0]  # (H,W,8)
+        if ids is not None:
+            return self._encode_and_stats(ids, color_bgr)
+        return self._postprocess_prediction(out)
 
-        # Prédiction
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Exécute une seule inférence sur un batch d'images prétraitées.
+
+        Les backends à batch fixe (TensorRT/TFLite, qui exposent
+        max_batch_size) ne peuvent pas avaler un batch empilé : le batch
+        est alors découpé en tranches de la taille acceptée.
+        """
         model = self.model
-        print(f"Model loaded: {type(model)}")
+        if self._infer_batch is not None:
+            import tensorflow as tf
+
+            return self._infer_batch(tf.constant(batch)).numpy()
+        max_bs = getattr(model, "max_batch_size", None)
+        if max_bs is not None and batch.shape[0] > max_bs:
+            return np.concatenate(
+                [
+                    model.predict(batch[i : i + max_bs])
+                    for i in range(0, batch.shape[0], max_bs)
+                ]
+            )
+        return model.predict(batch)
 
-        print("Running prediction...")
-        out = model.predict(x)[0]  # (H,W,8)
-        print(f"Prediction output shape: {out.shape}")
+    async def segment_image_batched(
+        self, image_bytes: bytes, queue
+    ) -> Tuple[bytes, dict]:
+        """Segmentation dont la passe GPU transite par la file de micro-batching.
 
-        ids = np.argmax(out, -1).astype(np.uint8)
-        print(f"Segmentation IDs shape: {ids.shape}")
+        Le prétraitement et le post-traitement restent par requête mais
+        partent dans le threadpool : le décodage cv2 et l'encodage PNG
+        sont bloquants et ne doivent pas geler l'event loop. Seule la
+        prédiction est regroupée avec les requêtes concurrentes.
+        """
+        x = await asyncio.to_thread(self.preprocess_image, image_bytes)
+        out = await queue.add_request(x)
+        return await asyncio.to_thread(self._postprocess_prediction, out)
 
-        color = self.PALETTE[ids]
-        print(f"Color image shape: {color.shape}")
+    def _postprocess_prediction(self, out: np.ndarray) -> Tuple[bytes, dict]:
+        """Convertit les logits (H,W,8) en PNG colorisé + statistiques.
 
-        # Encodage PNG en mémoire
-        print("Encoding PNG...")
-        _, buf = cv2.imencode(".png", cv2.cvtColor(color, cv2.COLOR_RGB2BGR))
-        print(f"PNG encoded, size: {len(buf.tobytes())} bytes")
+        Réutilise les buffers ids/couleur préalloués quand la sortie a
+        la taille nominale : zéro malloc par requête en régime établi.
+        """
+        if tuple(out.shape[:2]) == tuple(self.IMG_SIZE):
+            # Les buffers partagés sont protégés par _post_lock jusqu'à
+            # la fin de l'encodage PNG et du calcul des statistiques
+            with self._post_lock:
+                return self._postprocess_into(
+                    out, self._ids_buf, self._color_buf
+                )
+        # Taille inattendue (mocks de test, modèles exotiques) :
+        # allocation ponctuelle
+        ids = np.empty(out.shape[:2], np.uint8)
+        color_bgr = np.empty((*out.shape[:2], 3), np.uint8)
+        return self._postprocess_into(out, ids, color_bgr)
+
+    def _postprocess_into(
+        self, out: np.ndarray, ids: np.ndarray, color_bgr: np.ndarray
+    ) -> Tuple[bytes, dict]:
+        """Argmax + palette écrits dans les buffers fournis"""
+        if NUMBA_AVAILABLE and out.dtype == np.uint8 and out.shape[-1] == 8:
+            # Sortie quantifiée : les 8 logits d'un pixel tiennent dans un
+            # mot uint64, argmax SWAR par shifts/masques
+            words = np.ascontiguousarray(out).view(np.uint64).ravel()
+            _argmax8_u8(words, ids.reshape(-1))
+            np.take(self.PALETTE_BGR, ids, axis=0, out=color_bgr)
+        elif NUMBA_AVAILABLE:
+            # Kernel fusionné : argmax + palette BGR en une seule passe
+            _fuse_argmax_palette_bgr(
+                np.ascontiguousarray(out), self.PALETTE_BGR, ids, color_bgr
+            )
+        else:
+            # np.take sur la palette BGR : gather optimisé, et pas de
+            # passe cvtColor puisque la palette est déjà en ordre BGR
+            ids[:] = np.argmax(out, -1)
+            np.take(self.PALETTE_BGR, ids, axis=0, out=color_bgr)
+        return self._encode_and_stats(ids, color_bgr)
 
+    def _encode_and_stats(
+        self, ids: np.ndarray, color_bgr: np.ndarray
+    ) -> Tuple[bytes, dict]:
+        """Encode le masque colorisé en PNG et calcule les statistiques"""
+        # Encodage PNG en mémoire. Niveau zlib 1 : un masque à 8 couleurs
+        # reste très compressible et l'encodage est 2-4x plus rapide que le
+        # niveau 3 par défaut d'OpenCV
+        _, buf = cv2.imencode(
+            ".png", color_bgr, [cv2.IMWRITE_PNG_COMPRESSION, 1]
+        )
         # Statistiques de segmentation
-        print("Calculating statistics...")
         stats = self._get_segmentation_stats(ids)
-        print(f"Statistics calculated: {stats}")
-
-        print("Segmentation completed successfully")
         return buf.tobytes(), stats
 
     def _get_segmentation_stats(self, segmentation_ids: np.ndarray) -> dict:
         """Calcule les statistiques de segmentation"""
         total_pixels = segmentation_ids.size
 
-        stats = {}
-        for i, class_name in enumerate(self.CLASS_NAMES):
-            pixel_count = np.sum(segmentation_ids == i)
-            percentage = (pixel_count / total_pixels) * 100
-            stats[class_name] = {
-                "pixel_count": int(pixel_count),
-                "percentage": round(percentage, 2),
-            }
+        # Un seul passage O(N) au lieu de 8 masques booléens temporaires
+        counts = np.bincount(
+            segmentation_ids.ravel(), minlength=self.N_CLASSES
+        )
+        # Pourcentages vectorisés puis .tolist() : la boucle ne manipule
+        # que des scalaires Python natifs, pas des scalaires numpy
+        percentages = np.round(counts * (100.0 / total_pixels), 2)
+
+        return {
+            class_name: {"pixel_count": count, "percentage": percentage}
+            for class_name, count, percentage in zip(
+                self.CLASS_NAMES, counts.tolist(), percentages.tolist()
+            )
+        }
+
 
-        return stats
+# Instance partagée du service, créée à l'import : réutilisée entre les
+# requêtes et entre les invocations chaudes d'un même container Lambda
+service = SegmentationService()
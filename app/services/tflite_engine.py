@@ -0,0 +1,57 @@
+# app/services/tflite_engine.py
+import os
+
+from app.config import settings
+
+
+def tflite_path() -> str:
+    """Chemin du modèle TFLite quantifié, à côté du modèle Keras"""
+    base, _ = os.path.splitext(settings.MODEL_PATH)
+    return base + ".tflite"
+
+
+class TFLiteModel:
+    """Wrapper `.predict()` autour d'un interpréteur TFLite.
+
+    Utilise tous les coeurs CPU via XNNPACK et gère la
+    quantification/déquantification INT8 des entrées/sorties pour exposer
+    la même interface float32 que le modèle Keras.
+    """
+
+    # L'interpréteur est alloué avec l'entrée statique (1, H, W, 3) du
+    # modèle : la file de micro-batching doit découper ses batches
+    max_batch_size = 1
+
+    def __init__(self, model_path: str):
+        import numpy as np
+        import tensorflow as tf
+
+        self._np = np
+        self.interpreter = tf.lite.Interpreter(
+            model_path=model_path, num_threads=os.cpu_count()
+        )
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    def predict(self, x):
+        """Inférence : set_tensor -> invoke -> get_tensor"""
+        np = self._np
+
+        if self._input["dtype"] != np.float32:
+            # Entrée quantifiée : x_q = x / scale + zero_point
+            scale, zero_point = self._input["quantization"]
+            x = np.round(x / scale + zero_point).astype(self._input["dtype"])
+        else:
+            x = x.astype(np.float32)
+
+        self.interpreter.set_tensor(self._input["index"], x)
+        self.interpreter.invoke()
+        out = self.interpreter.get_tensor(self._output["index"])
+
+        if self._output["dtype"] != np.float32:
+            # Sortie quantifiée : out = (out_q - zero_point) * scale
+            scale, zero_point = self._output["quantization"]
+            out = (out.astype(np.float32) - zero_point) * scale
+
+        return out
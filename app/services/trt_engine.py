@@ -0,0 +1,299 @@
+# app/services/trt_engine.py
+import os
+import threading
+
+from app.config import settings
+
+# Import TensorRT / tf2onnx conditionally: they are only present on GPU
+# inference images, everywhere else we fall back to the Keras model.
+try:
+    import tensorrt as trt
+
+    TRT_AVAILABLE = True
+except ImportError:
+    TRT_AVAILABLE = False
+
+try:
+    import tf2onnx  # noqa: F401
+
+    TF2ONNX_AVAILABLE = True
+except ImportError:
+    TF2ONNX_AVAILABLE = False
+
+if TRT_AVAILABLE:
+
+    class _EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        """Calibrateur INT8 alimenté par des tuiles Cityscapes prétraitées.
+
+        Parcourt les images de `settings.CALIBRATION_DATA_DIR`, les
+        prétraite comme en inférence et les sert batch par batch à
+        TensorRT pendant la construction de l'engine.
+        """
+
+        def __init__(self, image_paths, preprocess_fn, batch_size=8):
+            super().__init__()
+            import pycuda.autoinit  # noqa: F401
+            import pycuda.driver as cuda
+
+            self._cuda = cuda
+            self.image_paths = list(image_paths)
+            self.preprocess_fn = preprocess_fn
+            self.batch_size = batch_size
+            self._index = 0
+
+            import numpy as np
+
+            sample = preprocess_fn(open(self.image_paths[0], "rb").read())
+            self._batch = np.zeros(
+                (batch_size, *sample.shape), dtype=np.float32
+            )
+            self._device_input = cuda.mem_alloc(self._batch.nbytes)
+            self._cache_file = plan_path() + ".calib"
+
+        def get_batch_size(self):
+            return self.batch_size
+
+        def get_batch(self, names):
+            if self._index + self.batch_size > len(self.image_paths):
+                return None
+            for i in range(self.batch_size):
+                with open(self.image_paths[self._index + i], "rb") as f:
+                    self._batch[i] = self.preprocess_fn(f.read())
+            self._index += self.batch_size
+            self._cuda.memcpy_htod(self._device_input, self._batch)
+            return [int(self._device_input)]
+
+        def read_calibration_cache(self):
+            if os.path.exists(self._cache_file):
+                with open(self._cache_file, "rb") as f:
+                    return f.read()
+            return None
+
+        def write_calibration_cache(self, cache):
+            with open(self._cache_file, "wb") as f:
+                f.write(cache)
+
+
+class TrtModel:
+    """Wrapper `.predict()` autour d'un ICudaEngine TensorRT.
+
+    Alloue les buffers device une seule fois et expose la même interface
+    que le modèle Keras pour que SegmentationService n'ait pas à
+    distinguer les deux backends.
+    """
+
+    # Les buffers host/device sont dimensionnés pour un seul exemplaire
+    # (abs() sur la dimension batch dynamique -1) : la file de
+    # micro-batching doit découper ses batches en conséquence
+    max_batch_size = 1
+
+    def __init__(self, engine):
+        import numpy as np
+        import pycuda.autoinit  # noqa: F401
+        import pycuda.driver as cuda
+
+        self._np = np
+        self._cuda = cuda
+        self.engine = engine
+        self.context = engine.create_execution_context()
+        self._stream = cuda.Stream()
+
+        # Buffers host/device alloués une fois pour toutes les requêtes
+        self._bindings = []
+        self._host_buffers = []
+        self._device_buffers = []
+        self._output_indices = []
+        for i in range(engine.num_bindings):
+            shape = tuple(abs(s) for s in engine.get_binding_shape(i))
+            dtype = trt.nptype(engine.get_binding_dtype(i))
+            host = cuda.pagelocked_empty(int(np.prod(shape)), dtype)
+            device = cuda.mem_alloc(host.nbytes)
+            self._bindings.append(int(device))
+            self._host_buffers.append((host, shape))
+            self._device_buffers.append(device)
+            if not engine.binding_is_input(i):
+                self._output_indices.append(i)
+
+    def predict(self, x):
+        """Inférence : memcpy_htod -> execute_async_v2 -> memcpy_dtoh"""
+        host_in, _ = self._host_buffers[0]
+        host_in[:] = self._np.ascontiguousarray(x, dtype=host_in.dtype).ravel()
+        self._cuda.memcpy_htod_async(
+            self._device_buffers[0], host_in, self._stream
+        )
+        self.context.execute_async_v2(
+            bindings=self._bindings, stream_handle=self._stream.handle
+        )
+        out_idx = self._output_indices[0]
+        host_out, out_shape = self._host_buffers[out_idx]
+        self._cuda.memcpy_dtoh_async(
+            host_out, self._device_buffers[out_idx], self._stream
+        )
+        self._stream.synchronize()
+        return host_out.reshape(out_shape)
+
+
+def _calibration_images():
+    """Liste les images de calibration disponibles (vide si aucune)"""
+    calib_dir = settings.CALIBRATION_DATA_DIR
+    if not os.path.isdir(calib_dir):
+        return []
+    return sorted(
+        os.path.join(calib_dir, name)
+        for name in os.listdir(calib_dir)
+        if name.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+
+
+# Engine/model partagés par tout le process (chargés une seule fois)
+_engine = None
+_context = None
+_trt_model = None
+_tflite_model = None
+_keras_model = None
+_lock = threading.Lock()
+
+
+def plan_path() -> str:
+    """Chemin du plan TensorRT sérialisé, à côté du modèle Keras"""
+    base, _ = os.path.splitext(settings.MODEL_PATH)
+    return base + ".plan"
+
+
+def _build_engine():
+    """Convertit le modèle Keras en engine TensorRT (ONNX -> .plan)"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(settings.MODEL_PATH, compile=False)
+
+    import tf2onnx as _tf2onnx
+
+    onnx_model, _ = _tf2onnx.convert.from_keras(model)
+
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    network = builder.create_network(
+        1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH)
+    )
+    parser = trt.OnnxParser(network, logger)
+    if not parser.parse(onnx_model.SerializeToString()):
+        raise RuntimeError("Failed to parse ONNX model for TensorRT")
+
+    config = builder.create_builder_config()
+    if builder.platform_has_fast_fp16:
+        config.set_flag(trt.BuilderFlag.FP16)
+
+    # INT8 avec calibration entropique quand un jeu de calibration est fourni
+    calib_images = _calibration_images()
+    if builder.platform_has_fast_int8 and calib_images:
+        try:
+            from app.services.segmentation_service import SegmentationService
+
+            config.set_flag(trt.BuilderFlag.INT8)
+            config.int8_calibrator = _EntropyCalibrator(
+                calib_images, SegmentationService().preprocess_image
+            )
+            print(f"INT8 calibration enabled ({len(calib_images)} images)")
+        except Exception as e:
+            print(f"INT8 calibration unavailable, staying FP16: {e}")
+
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+
+    # Sérialiser le plan à côté du .keras pour les démarrages suivants
+    with open(plan_path(), "wb") as f:
+        f.write(serialized)
+
+    runtime = trt.Runtime(logger)
+    return runtime.deserialize_cuda_engine(serialized)
+
+
+def _deserialize_engine():
+    """Désérialise un plan TensorRT existant"""
+    logger = trt.Logger(trt.Logger.WARNING)
+    runtime = trt.Runtime(logger)
+    with open(plan_path(), "rb") as f:
+        return runtime.deserialize_cuda_engine(f.read())
+
+
+def load_engine():
+    """Charge l'engine (ou le modèle Keras en fallback) une seule fois.
+
+    Appelé au démarrage de FastAPI; les appels suivants retournent le
+    handle déjà chargé.
+    """
+    global _engine, _context, _trt_model, _tflite_model, _keras_model
+
+    with _lock:
+        if is_engine_loaded():
+            return _trt_model or _tflite_model or _keras_model
+
+        if not os.path.exists(settings.MODEL_PATH):
+            print(f"Model file not found at {settings.MODEL_PATH}, skipping load")
+            return None
+
+        if TRT_AVAILABLE:
+            try:
+                if os.path.exists(plan_path()):
+                    _engine = _deserialize_engine()
+                elif TF2ONNX_AVAILABLE:
+                    _engine = _build_engine()
+                if _engine is not None:
+                    _trt_model = TrtModel(_engine)
+                    _context = _trt_model.context
+                    print("TensorRT engine loaded successfully")
+                    return _trt_model
+            except Exception as e:
+                print(f"TensorRT engine load failed, falling back to Keras: {e}")
+
+        # Fallback CPU : modèle TFLite INT8 (XNNPACK) si exporté offline
+        from app.services import tflite_engine
+
+        if os.path.exists(tflite_engine.tflite_path()):
+            try:
+                _tflite_model = tflite_engine.TFLiteModel(
+                    tflite_engine.tflite_path()
+                )
+                print("TFLite model loaded successfully")
+                return _tflite_model
+            except Exception as e:
+                print(f"TFLite load failed, falling back to Keras: {e}")
+
+        # Fallback: modèle Keras chargé une fois et partagé
+        try:
+            import tensorflow as tf
+
+            _keras_model = tf.keras.models.load_model(
+                settings.MODEL_PATH, compile=False
+            )
+            print("Keras model loaded successfully (TensorRT unavailable)")
+            return _keras_model
+        except Exception as e:
+            print(f"Model loading failed: {e}")
+            return None
+
+
+def get_engine():
+    """Retourne le modèle d'inférence partagé (TensorRT ou Keras), chargé lazy.
+
+    Les deux backends exposent `.predict(x)`, le service n'a pas à les
+    distinguer.
+    """
+    if not is_engine_loaded():
+        return load_engine()
+    return _trt_model or _tflite_model or _keras_model
+
+
+def get_context():
+    """Retourne l'IExecutionContext TensorRT (None en mode Keras)"""
+    return _context
+
+
+def is_engine_loaded() -> bool:
+    """Indique si un engine ou un modèle fallback est déjà en mémoire"""
+    return (
+        _engine is not None
+        or _tflite_model is not None
+        or _keras_model is not None
+    )
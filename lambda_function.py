@@ -0,0 +1,45 @@
+# Point d'entrée AWS Lambda
+# Le modèle est chargé et tracé au chargement du module : le coût est payé
+# une seule fois à l'init du container, pas sur la première invocation.
+
+import os
+
+# Knobs de threading TF à positionner AVANT l'import de TensorFlow :
+# kernels oneDNN (AVX2/AVX-512 sur les Xeon de Lambda), intra-op calé sur
+# les vCPUs disponibles et inter-op à 1 pour éviter la sursouscription
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 2))
+os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(os.cpu_count() or 2))
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+from app.api.segmentation import segmentation_service  # noqa: E402
+from app.main import app  # noqa: E402
+
+# Mangum adapte l'application ASGI au format d'événement Lambda; absent en
+# dehors du packaging Lambda
+try:
+    from mangum import Mangum
+
+    handler = Mangum(app)
+except ImportError:
+    handler = None
+
+# Singleton partagé entre les invocations du container
+_svc = segmentation_service
+
+try:
+    # Récupérer le modèle depuis S3 si l'image/layer ne l'embarque pas,
+    # puis inférence factice pour tracer le graphe pendant l'init (skippe
+    # proprement si le modèle n'est pas présent)
+    from app.services.model_loader import ensure_model_available
+    from app.services import trt_engine
+
+    ensure_model_available()
+    # Charger via trt_engine d'abord : le warmup adopte ce handle partagé
+    # et le startup_event rejoué par le lifespan Mangum voit l'engine déjà
+    # chargé — une seule copie du modèle en mémoire, pas deux
+    trt_engine.load_engine()
+    _svc.warmup()
+except Exception as e:
+    print(f"Lambda warmup failed: {e}")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Export offline du modèle Keras vers un engine TensorRT (.plan).
+
+Usage:
+    python scripts/export_tensorrt.py [--int8]
+
+Convertit settings.MODEL_PATH en ONNX via tf2onnx puis construit un
+engine FP16 (INT8 avec calibration si --int8 et qu'un jeu de calibration
+est présent dans settings.CALIBRATION_DATA_DIR). Le .plan est écrit à
+côté du .keras; au démarrage l'API le désérialise directement au lieu de
+reconstruire l'engine.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.services import trt_engine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="calibrer en INT8 (nécessite des images dans "
+        f"{settings.CALIBRATION_DATA_DIR})",
+    )
+    args = parser.parse_args()
+
+    if not trt_engine.TRT_AVAILABLE:
+        sys.exit("TensorRT is not installed; install tensorrt + tf2onnx first")
+    if not os.path.exists(settings.MODEL_PATH):
+        sys.exit(f"Model file not found at {settings.MODEL_PATH}")
+
+    if args.int8 and not os.path.isdir(settings.CALIBRATION_DATA_DIR):
+        sys.exit(
+            f"--int8 requested but {settings.CALIBRATION_DATA_DIR} "
+            "contains no calibration images"
+        )
+
+    engine = trt_engine._build_engine()
+    if engine is None:
+        sys.exit("Engine build failed")
+
+    print(f"Engine written to {trt_engine.plan_path()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Export offline du modèle Keras vers TFLite INT8 (XNNPACK CPU).
+
+Usage:
+    python scripts/export_tflite.py
+
+Quantifie le modèle en INT8 complet avec un representative dataset lu
+dans settings.CALIBRATION_DATA_DIR (FP32 simple si le dossier est vide).
+Le .tflite est écrit à côté du .keras et chargé en fallback CPU par
+app/services/tflite_engine.py.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.services.tflite_engine import tflite_path  # noqa: E402
+
+
+def main():
+    import numpy as np
+    import tensorflow as tf
+
+    if not os.path.exists(settings.MODEL_PATH):
+        sys.exit(f"Model file not found at {settings.MODEL_PATH}")
+
+    model = tf.keras.models.load_model(settings.MODEL_PATH, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    calib_dir = settings.CALIBRATION_DATA_DIR
+    if os.path.isdir(calib_dir) and os.listdir(calib_dir):
+        from app.services.segmentation_service import SegmentationService
+
+        service = SegmentationService()
+
+        def representative_dataset():
+            for name in sorted(os.listdir(calib_dir))[:500]:
+                if not name.lower().endswith((".png", ".jpg", ".jpeg")):
+                    continue
+                with open(os.path.join(calib_dir, name), "rb") as f:
+                    x = service.preprocess_image(f.read())
+                yield [x[None, ...].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8
+        ]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+        print(f"INT8 quantization with calibration set from {calib_dir}")
+    else:
+        print("No calibration images found, exporting FP32 TFLite")
+
+    tflite_model = converter.convert()
+    with open(tflite_path(), "wb") as f:
+        f.write(tflite_model)
+
+    print(f"TFLite model written to {tflite_path()}")
+
+
+if __name__ == "__main__":
+    main()
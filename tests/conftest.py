@@ -1,14 +1,93 @@
+import functools
 import io
 import os
-import sys
+import types
 from unittest.mock import Mock, patch
 
 import numpy as np
 import pytest
-from PIL import Image
+from PIL import Image, ImageColor
+
+from app.services.segmentation_service import _path_exists_cached
+
+# `app` is importable via pythonpath = . in pytest.ini, so no sys.path
+# surgery is needed here. numpy, PIL and the service module are imported
+# at the top: the autouse fixtures below touch all of them anyway, so
+# deferring the imports inside helpers would not save any test run a
+# single module load.
+
+
+@functools.lru_cache(maxsize=None)
+def _png_bytes(width, height, color):
+    """Solid-color PNG bytes, memoized on (width, height, color).
+
+    PNG encoding is deterministic and comparatively expensive (zlib);
+    repeated requests for the same image hit a dict lookup instead.
+    Uses palette mode with compress_level=1: the IDAT of a uniform
+    image is one byte per pixel and compresses trivially, so there is
+    no point paying for full-resolution RGB DEFLATE.
+    """
+    img = Image.new("P", (width, height), 0)
+    img.putpalette(list(ImageColor.getrgb(color)) * 256)
+    # the with block releases the encoder's internal buffer immediately
+    # instead of leaving it for GC
+    with io.BytesIO() as buf:
+        img.save(buf, format="PNG", optimize=False, compress_level=1)
+        return buf.getvalue()
+
+
+# Precomputed 1x1 palette PNG for tests whose payload only ever reaches
+# a mocked service: no Pillow work at all, and ~80 bytes in flight per
+# request instead of a full encoded frame
+MINIMAL_PNG: bytes = bytes.fromhex(
+    "89504e470d0a1a0a0000000d494844520000000100000001010300000025db56ca"
+    "00000003504c5445000000a77a3dda0000000a4944415478da6360000000020001"
+    "e527defc0000000049454e44ae426082"
+)
+
+
+def _multipart_body(filename, payload, content_type):
+    """Pre-encoded multipart upload for repeated POSTs.
+
+    Returns (body, header_content_type). Encoding the form once and
+    posting raw bytes skips httpx's per-request boundary generation and
+    multipart re-encoding when the same payload is sent many times.
+    """
+    boundary = "pytestboundary"
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + payload + tail, f"multipart/form-data; boundary={boundary}"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_codecs():
+    """Prewarm TensorFlow and the Pillow codecs once per session.
+
+    First touch of `import tensorflow` and of each image encoder loads
+    large shared libraries; paying that inside whichever test happens to
+    run first would leak seconds of variance into the latency
+    assertions of the performance tests.
+    """
+    import tensorflow  # noqa: F401
+
+    for format_name in ("PNG", "JPEG", "BMP"):
+        with io.BytesIO() as buf:
+            Image.new("RGB", (8, 8)).save(buf, format=format_name)
 
-# add the root directory to the path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def _clear_model_path_cache():
+    """Reset the service's memoized model-path stat between tests.
+
+    Tests patch os.path.exists with both True and False; without the
+    clear, the first patched answer would be served from the lru_cache
+    to every later test in the worker.
+    """
+    _path_exists_cached.cache_clear()
 
 
 @pytest.fixture(scope="session")
@@ -17,7 +96,9 @@ def mock_tensorflow():
     with patch("tensorflow.keras.models.load_model") as mock_load_model:
         # create a mock of the model
         mock_model = Mock()
-        mock_model.predict.return_value = [np.random.rand(256, 512, 8)]
+        # zeros instead of np.random.rand: no test reads the values, and
+        # float32 matches the real model's output dtype at half the size
+        mock_model.predict.return_value = [np.zeros((256, 512, 8), dtype=np.float32)]
         mock_model.count_params.return_value = 1000000
         mock_model.summary = Mock(return_value="Mock Model Summary")
 
@@ -25,83 +106,91 @@ def mock_tensorflow():
         yield mock_load_model
 
 
-@pytest.fixture
-def sample_image_bytes():
-    """Test image in bytes"""
-    img = Image.new("RGB", (100, 100), color="red")
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format="PNG")
-    return img_bytes.getvalue()
+@pytest.fixture(scope="session")
+def client():
+    """Shared FastAPI test client.
 
+    Session-scoped so route setup and OpenAPI schema generation are paid
+    once. Deliberately not used as a context manager: startup events
+    would wire the micro-batching queue, which bypasses the mocked
+    segmentation service the integration tests rely on.
+    """
+    from fastapi.testclient import TestClient
 
-@pytest.fixture
-def sample_urban_image_bytes():
-    """Realistic test image"""
-    img = Image.new("RGB", (512, 256), color="gray")
+    from app.main import app
 
-    # add urban elements
-    # Route (bas)
-    for x in range(512):
-        for y in range(200, 256):
-            img.putpixel((x, y), (128, 64, 128))
+    return TestClient(app)
 
-    # Bâtiments (haut)
-    for x in range(512):
-        for y in range(0, 100):
-            img.putpixel((x, y), (220, 20, 60))
 
-    # Ciel (coin supérieur)
-    for x in range(512):
-        for y in range(0, 50):
-            img.putpixel((x, y), (70, 130, 180))
+@pytest.fixture(scope="session")
+def sample_image_bytes():
+    """Test image in bytes.
 
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format="PNG")
-    return img_bytes.getvalue()
+    2x2 instead of 100x100: preprocessing resizes to IMG_SIZE anyway,
+    so only the decoded shape matters and the encode/decode work per
+    use drops with the pixel count.
+    """
+    return _png_bytes(2, 2, "red")
 
 
-@pytest.fixture
-def mock_segmentation_stats():
-    """Mocked segmentation statistics"""
-    return {
-        "road": {"pixel_count": 14336, "percentage": 28.0},
-        "building": {"pixel_count": 10240, "percentage": 20.0},
-        "car": {"pixel_count": 5120, "percentage": 10.0},
-        "traffic_sign": {"pixel_count": 2560, "percentage": 5.0},
-        "person": {"pixel_count": 1280, "percentage": 2.5},
-        "vegetation": {"pixel_count": 2560, "percentage": 5.0},
-        "sky": {"pixel_count": 12800, "percentage": 25.0},
-        "background": {"pixel_count": 1536, "percentage": 3.0},
+@pytest.fixture(scope="session")
+def sample_urban_image_bytes():
+    """Realistic test image"""
+    # build the regions with numpy slice assignment instead of ~130k
+    # putpixel calls
+    arr = np.empty((256, 512, 3), np.uint8)
+    arr[:] = (128, 128, 128)  # gray background
+    arr[200:256, :] = (128, 64, 128)  # road (bottom)
+    arr[0:100, :] = (220, 20, 60)  # buildings (top)
+    arr[0:50, :] = (70, 130, 180)  # sky (upper band)
+    img = Image.fromarray(arr, "RGB")
+
+    with io.BytesIO() as img_bytes:
+        img.save(img_bytes, format="PNG", compress_level=1)
+        return img_bytes.getvalue()
+
+
+# Built once at import and frozen: tests only read the stats, and the
+# read-only proxy turns any accidental cross-test mutation into a
+# TypeError instead of silent state leakage. Mutating tests can
+# copy.deepcopy.
+_SEGMENTATION_STATS = types.MappingProxyType(
+    {
+        "road": types.MappingProxyType({"pixel_count": 14336, "percentage": 28.0}),
+        "building": types.MappingProxyType({"pixel_count": 10240, "percentage": 20.0}),
+        "car": types.MappingProxyType({"pixel_count": 5120, "percentage": 10.0}),
+        "traffic_sign": types.MappingProxyType(
+            {"pixel_count": 2560, "percentage": 5.0}
+        ),
+        "person": types.MappingProxyType({"pixel_count": 1280, "percentage": 2.5}),
+        "vegetation": types.MappingProxyType({"pixel_count": 2560, "percentage": 5.0}),
+        "sky": types.MappingProxyType({"pixel_count": 12800, "percentage": 25.0}),
+        "background": types.MappingProxyType({"pixel_count": 1536, "percentage": 3.0}),
     }
+)
 
 
 @pytest.fixture
-def mock_segmented_image_bytes():
-    """Mocked segmented image in bytes"""
-    img = Image.new("RGB", (512, 256), color="red")
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format="PNG")
-    return img_bytes.getvalue()
-
+def mock_segmentation_stats():
+    """Mocked segmentation statistics (shared read-only mapping)"""
+    return _SEGMENTATION_STATS
 
-@pytest.fixture
-def test_environment():
-    """Test environment configuration"""
-    # test environment variables
-    os.environ["HOST"] = "127.0.0.1"
-    os.environ["PORT"] = "8000"
-    os.environ["RELOAD"] = "false"
-    os.environ["LOG_LEVEL"] = "error"
 
-    yield
+@pytest.fixture(scope="session")
+def mock_segmented_image_bytes():
+    """Mocked segmented image in bytes"""
+    return _png_bytes(512, 256, "red")
 
-    # clean up after tests
-    for var in ["HOST", "PORT", "RELOAD", "LOG_LEVEL"]:
-        if var in os.environ:
-            del os.environ[var]
 
+def pytest_configure(config):
+    """Set the test environment once at session start.
 
-@pytest.fixture(autouse=True)
-def setup_test_environment(test_environment):
-    """Automatic test environment configuration"""
-    pass
+    No test reads these variables per-call, so there is no need for an
+    autouse fixture mutating os.environ around every single test.
+    setdefault keeps pre-configured (or xdist-inherited) values intact.
+    HOST and LOG_LEVEL are deliberately left unset: they are read at
+    app.config import time and test_default_settings asserts their
+    defaults.
+    """
+    os.environ.setdefault("PORT", "8000")
+    os.environ.setdefault("RELOAD", "false")
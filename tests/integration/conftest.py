@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.api import segmentation as segmentation_api
+from tests.conftest import MINIMAL_PNG, _multipart_body
+
+
+@pytest.fixture(autouse=True)
+def mock_segment(mocker):
+    """Mocked segmentation service shared by every integration test.
+
+    One patch per test instead of a with-patch block per call site;
+    tests set mock_segment.return_value inline.
+    """
+    return mocker.patch.object(segmentation_api.segmentation_service, "segment_image")
+
+
+async def post_minimal_png_concurrently(n):
+    """POST n concurrent /api/segment uploads of the minimal PNG.
+
+    Drives the ASGI app from one event loop so the requests actually
+    interleave, instead of serializing threads through the sync
+    TestClient. The multipart form is encoded once instead of per
+    request, and the payload is only echoed by the mocked service, so
+    the minimal PNG keeps the bytes-in-flight tiny.
+    """
+    import httpx
+
+    from app.main import app
+
+    body, content_type = _multipart_body("test_image.png", MINIMAL_PNG, "image/png")
+    headers = {"content-type": content_type}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await asyncio.gather(
+            *[
+                ac.post("/api/segment", content=body, headers=headers)
+                for _ in range(n)
+            ]
+        )
@@ -1,59 +1,74 @@
-import io
-from unittest.mock import patch
-
 import pytest
-from fastapi.testclient import TestClient
-from PIL import Image
 
-from app.main import app
+from app.api import segmentation as segmentation_api
+from tests.conftest import _png_bytes
 
 
-class TestAPIEndpoints:
-    """Integration tests for API endpoints"""
+@pytest.fixture(scope="session")
+def sample_image_bytes():
+    """Test image in bytes (encoded once per session, the bytes are immutable)"""
+    return _png_bytes(100, 100, "blue")
 
-    @pytest.fixture
-    def client(self):
-        """Test client for FastAPI"""
-        return TestClient(app)
 
-    @pytest.fixture
-    def sample_image_bytes(self):
-        """Test image in bytes"""
-        img = Image.new("RGB", (100, 100), color="blue")
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format="PNG")
-        return img_bytes.getvalue()
+# Mock segmented PNG, encoded once at import
+_MOCK_SEG_PNG: bytes = _png_bytes(256, 512, "red")
+
+
+@pytest.fixture(scope="session")
+def large_payload_bytes():
+    """Large synthetic upload payload, built once per session.
+
+    A PNG magic header plus padding: the service is mocked in the tests
+    that use it, so the body is never decoded.
+    """
+    return b"\x89PNG\r\n\x1a\n" + b"\x00" * (4 * 1024 * 1024)
+
+
+@pytest.fixture(scope="session")
+def cors_preflight(client):
+    """One OPTIONS preflight per session.
+
+    CORS configuration is static, so the middleware's answer never
+    changes; reuse a single response instead of re-dispatching.
+    """
+    headers = {
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "content-type",
+    }
+    return client.options("/api/segment", headers=headers)
+
+
+class TestAPIEndpoints:
+    """Integration tests for API endpoints"""
 
     @pytest.fixture
-    def mock_segmentation_service(self):
+    def mock_segmentation_service(self, mocker):
         """Mock segmentation service"""
-        with patch(
-            "app.api.segmentation.segmentation_service.segment_image"
-        ) as mock_service:
-            # Mock return data
-            mock_stats = {
-                "road": {"pixel_count": 1000, "percentage": 25.0},
-                "building": {"pixel_count": 800, "percentage": 20.0},
-                "car": {"pixel_count": 600, "percentage": 15.0},
-                "traffic_sign": {"pixel_count": 400, "percentage": 10.0},
-                "person": {"pixel_count": 300, "percentage": 7.5},
-                "vegetation": {"pixel_count": 500, "percentage": 12.5},
-                "sky": {"pixel_count": 300, "percentage": 7.5},
-                "background": {"pixel_count": 100, "percentage": 2.5},
-            }
-
-            # create mock PNG image
-            mock_img = Image.new("RGB", (256, 512), color="red")
-            mock_img_bytes = io.BytesIO()
-            mock_img.save(mock_img_bytes, format="PNG")
-
-            mock_service.return_value = (mock_img_bytes.getvalue(), mock_stats)
-            yield mock_service
+        # patch.object on the imported module skips the string-target
+        # import/getattr resolution patch() would redo per test
+        mock_service = mocker.patch.object(
+            segmentation_api.segmentation_service, "segment_image"
+        )
+        # Mock return data
+        mock_stats = {
+            "road": {"pixel_count": 1000, "percentage": 25.0},
+            "building": {"pixel_count": 800, "percentage": 20.0},
+            "car": {"pixel_count": 600, "percentage": 15.0},
+            "traffic_sign": {"pixel_count": 400, "percentage": 10.0},
+            "person": {"pixel_count": 300, "percentage": 7.5},
+            "vegetation": {"pixel_count": 500, "percentage": 12.5},
+            "sky": {"pixel_count": 300, "percentage": 7.5},
+            "background": {"pixel_count": 100, "percentage": 2.5},
+        }
+
+        mock_service.return_value = (_MOCK_SEG_PNG, mock_stats)
+        return mock_service
 
     def test_root_endpoint_browser(self, client):
         """Test root endpoint for browsers (HTML)"""
         headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
         }
         response = client.get("/", headers=headers)
 
@@ -196,72 +211,68 @@ class TestAPIEndpoints:
         assert "paths" in data
         assert data["info"]["title"] == "Cityscapes Semantic Segmentation API"
 
-    def test_cors_headers(self, client):
+    def test_cors_headers(self, cors_preflight):
         """Test CORS headers"""
-        # Test with an endpoint that supports OPTIONS (POST)
-        headers = {
-            "Origin": "http://localhost:3000",
-            "Access-Control-Request-Method": "POST",
-            "Access-Control-Request-Headers": "content-type",
-        }
-        response = client.options("/api/segment", headers=headers)
-
         # check if CORS headers are present
-        assert "access-control-allow-origin" in response.headers
-        assert "access-control-allow-methods" in response.headers
+        assert "access-control-allow-origin" in cors_preflight.headers
+        assert "access-control-allow-methods" in cors_preflight.headers
 
-    def test_error_handling(self, client, sample_image_bytes):
+    def test_error_handling(self, client, sample_image_bytes, mocker):
         """Test error handling"""
-        # Mock an error in the service
-        with patch(
-            "app.api.segmentation.segmentation_service.segment_image",
+        # Mock an error in the service; patch.object skips the
+        # string-target import/getattr resolution of patch()
+        mocker.patch.object(
+            segmentation_api.segmentation_service,
+            "segment_image",
             side_effect=Exception("Test error"),
-        ):
-            files = {"file": ("test_image.png", sample_image_bytes, "image/png")}
-            response = client.post("/api/segment", files=files)
+        )
+        files = {"file": ("test_image.png", sample_image_bytes, "image/png")}
+        response = client.post("/api/segment", files=files)
 
-            assert response.status_code == 500
-            data = response.json()
-            assert "detail" in data
-            assert "error" in data["detail"].lower()
+        assert response.status_code == 500
+        data = response.json()
+        assert "detail" in data
+        assert "error" in data["detail"].lower()
 
-    def test_large_image_handling(self, client):
+    def test_large_image_handling(self, client, large_payload_bytes, mocker):
         """Test large image handling"""
-        # create a larger image
-        large_img = Image.new("RGB", (2000, 2000), color="green")
-        large_img_bytes = io.BytesIO()
-        large_img.save(large_img_bytes, format="PNG")
+        large_img_bytes = large_payload_bytes
 
-        with patch(
-            "app.api.segmentation.segmentation_service.segment_image"
-        ) as mock_service:
-            mock_service.return_value = (large_img_bytes.getvalue(), {})
+        mock_service = mocker.patch.object(
+            segmentation_api.segmentation_service, "segment_image"
+        )
+        mock_service.return_value = (large_img_bytes, {})
 
-            files = {
-                "file": ("large_image.png", large_img_bytes.getvalue(), "image/png")
-            }
-            response = client.post("/api/segment", files=files)
+        files = {"file": ("large_image.png", large_img_bytes, "image/png")}
+        response = client.post("/api/segment", files=files)
 
-            assert response.status_code == 200
+        assert response.status_code == 200
 
-    def test_multiple_concurrent_requests(
-        self, client, sample_image_bytes, mock_segmentation_service
+    @pytest.mark.asyncio
+    async def test_multiple_concurrent_requests(
+        self, sample_image_bytes, mock_segmentation_service
     ):
         """Test concurrent requests"""
-        import concurrent.futures
+        import asyncio
 
-        def make_request():
-            files = {"file": ("test_image.png", sample_image_bytes, "image/png")}
-            return client.post("/api/segment", files=files)
+        import httpx
+
+        from app.main import app
 
-        # make 5 concurrent requests
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(make_request) for _ in range(5)]
-            responses = [future.result() for future in futures]
+        # hit the in-process ASGI app directly with one event loop
+        # instead of a thread pool serializing through the sync client
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as ac:
+            files = {"file": ("test_image.png", sample_image_bytes, "image/png")}
+            responses = await asyncio.gather(
+                *[ac.post("/api/segment", files=files) for _ in range(5)]
+            )
 
-        # check if all requests were successful
-        for response in responses:
-            assert response.status_code == 200
+        # check if all requests were successful (a failure shows every
+        # status code, not just the first bad one)
+        assert {response.status_code for response in responses} == {200}
 
         # check if service was called 5 times
         assert mock_segmentation_service.call_count == 5
@@ -0,0 +1,71 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.batch_queue import AsyncBatchQueue
+
+
+class TestAsyncBatchQueue:
+    """Tests for the micro-batching inference queue"""
+
+    @pytest.mark.asyncio
+    async def test_single_request(self):
+        """Test that a lone request is processed as a batch of one"""
+        batch_shapes = []
+
+        def process(batch):
+            batch_shapes.append(batch.shape)
+            return batch + 1
+
+        queue = AsyncBatchQueue(process, max_wait_time=0.001)
+        await queue.start()
+        try:
+            out = await queue.add_request(np.zeros((2, 2), np.float32))
+        finally:
+            await queue.stop()
+
+        assert np.array_equal(out, np.ones((2, 2), np.float32))
+        assert batch_shapes == [(1, 2, 2)]
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_requests(self):
+        """Test that concurrent requests share one forward pass"""
+        batch_sizes = []
+
+        def process(batch):
+            batch_sizes.append(batch.shape[0])
+            return batch
+
+        queue = AsyncBatchQueue(process, max_batch_size=4, max_wait_time=0.05)
+        tensors = [np.full((2, 2), i, np.float32) for i in range(4)]
+
+        # enqueue everything before starting the worker so the batching
+        # is deterministic instead of racing the coalescing window
+        tasks = [asyncio.ensure_future(queue.add_request(t)) for t in tensors]
+        await asyncio.sleep(0.01)
+        await queue.start()
+        try:
+            outputs = await asyncio.gather(*tasks)
+        finally:
+            await queue.stop()
+
+        # one stacked pass, and each request got its own slice back
+        assert batch_sizes == [4]
+        for tensor, output in zip(tensors, outputs):
+            assert np.array_equal(output, tensor)
+
+    @pytest.mark.asyncio
+    async def test_propagates_process_error(self):
+        """Test that a failing forward pass rejects the waiting request"""
+
+        def process(batch):
+            raise RuntimeError("inference failed")
+
+        queue = AsyncBatchQueue(process, max_wait_time=0.001)
+        await queue.start()
+        try:
+            with pytest.raises(RuntimeError, match="inference failed"):
+                await queue.add_request(np.zeros((2, 2), np.float32))
+        finally:
+            await queue.stop()
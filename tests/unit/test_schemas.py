@@ -6,6 +6,9 @@ from app.schemas.responses import (
     InfoResponse,
     SegmentationResponse,
     SegmentationStats,
+    validate_health,
+    validate_info,
+    validate_segmentation_stats,
 )
 
 
@@ -22,19 +25,19 @@ class TestHealthResponse:
         assert response.message == "API is running"
         assert response.timestamp == "2024-01-01T12:00:00"
 
-    def test_health_response_missing_fields(self):
-        """Test with missing fields"""
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            # missing fields
+            dict(status="healthy"),
+            # status should be a string
+            dict(status=123, message="test", timestamp="2024-01-01T12:00:00"),
+        ],
+    )
+    def test_health_response_invalid(self, kwargs):
+        """Test with missing fields or invalid types"""
         with pytest.raises(ValidationError):
-            HealthResponse(status="healthy")
-
-    def test_health_response_invalid_types(self):
-        """Test with invalid types"""
-        with pytest.raises(ValidationError):
-            HealthResponse(
-                status=123,  # should be a string
-                message="test",
-                timestamp="2024-01-01T12:00:00",
-            )
+            HealthResponse(**kwargs)
 
 
 class TestInfoResponse:
@@ -76,15 +79,18 @@ class TestSegmentationStats:
         assert stats.pixel_count == 1000
         assert stats.percentage == 25.5
 
-    def test_segmentation_stats_negative_values(self):
-        """Test with negative values"""
-        with pytest.raises(ValidationError):
-            SegmentationStats(pixel_count=-100, percentage=25.5)  # negative
-
-    def test_segmentation_stats_percentage_out_of_range(self):
-        """Test with a percentage out of range"""
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            dict(pixel_count=-100, percentage=25.5),  # negative count
+            dict(pixel_count=1000, percentage=150.0),  # > 100%
+            dict(pixel_count=1000, percentage=-1.0),  # negative percentage
+        ],
+    )
+    def test_segmentation_stats_invalid(self, kwargs):
+        """Test with out-of-range values"""
         with pytest.raises(ValidationError):
-            SegmentationStats(pixel_count=1000, percentage=150.0)  # > 100%
+            SegmentationStats(**kwargs)
 
 
 class TestSegmentationResponse:
@@ -117,25 +123,17 @@ class TestSegmentationResponse:
 
         assert response.stats == {}
 
-    def test_segmentation_response_invalid_image_size(self):
-        """Test with an invalid image size"""
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            dict(image_size=(0, 0), processing_time=1.0),  # invalid size
+            dict(image_size=(256, 512), processing_time=-1.0),  # negative time
+        ],
+    )
+    def test_segmentation_response_invalid(self, kwargs):
+        """Test with an invalid image size or processing time"""
         with pytest.raises(ValidationError):
-            SegmentationResponse(
-                message="Test",
-                stats={},
-                image_size=(0, 0),  # invalid size
-                processing_time=1.0,
-            )
-
-    def test_segmentation_response_negative_processing_time(self):
-        """Test with a negative processing time"""
-        with pytest.raises(ValidationError):
-            SegmentationResponse(
-                message="Test",
-                stats={},
-                image_size=(256, 512),
-                processing_time=-1.0,  # negative
-            )
+            SegmentationResponse(message="Test", stats={}, **kwargs)
 
 
 class TestSchemaValidation:
@@ -149,7 +147,10 @@ class TestSchemaValidation:
             "timestamp": "2024-01-01T12:00:00",
         }
 
-        response = HealthResponse(**data)
+        # the bound validate_python fast path validates a dict without
+        # going through BaseModel.__init__
+        response = validate_health(data)
+        assert isinstance(response, HealthResponse)
         assert response.status == data["status"]
 
     def test_info_response_from_dict(self):
@@ -162,12 +163,14 @@ class TestSchemaValidation:
             "endpoints": ["/health", "/info"],
         }
 
-        response = InfoResponse(**data)
+        response = validate_info(data)
+        assert isinstance(response, InfoResponse)
         assert response.name == data["name"]
 
     def test_segmentation_stats_from_dict(self):
         """Test creation from a dictionary"""
         data = {"pixel_count": 1000, "percentage": 25.5}
 
-        stats = SegmentationStats(**data)
+        stats = validate_segmentation_stats(data)
+        assert isinstance(stats, SegmentationStats)
         assert stats.pixel_count == data["pixel_count"]
@@ -5,44 +5,68 @@ import numpy as np
 import pytest
 from PIL import Image
 
+# the service imports TensorFlow lazily, so the patch target is the
+# real tf module — the same object its local imports resolve to
+import tensorflow as tf
+
+from app.services import trt_engine
 from app.services.segmentation_service import SegmentationService
 
+# One shared prediction array for every mocked model: the tests never
+# mutate it, so allocating 8 MB of fresh RNG output per test is wasted
+# work. float32 matches the real model's output dtype at half the size.
+_DUMMY_PRED = np.random.default_rng(0).random((256, 512, 8), dtype=np.float32)
+
+# Deterministic class ids with exactly equal counts per class: a tile
+# is a memcpy instead of PRNG output, and the percentages sum to
+# exactly 100 so the stats assertion needs no rounding tolerance
+_SEG_IDS = np.tile(np.arange(8, dtype=np.uint8), (256, 64))
+
+
+class _StubModel:
+    """Minimal model stand-in for tests that only consume predictions.
+
+    A plain staticmethod call instead of Mock.__call__ dispatch and
+    call-args recording; tests that assert on how the model was called
+    keep using a real Mock.
+    """
+
+    predict = staticmethod(lambda x, **kwargs: [_DUMMY_PRED])
+
 
 class TestSegmentationService:
     """Tests for the segmentation service"""
 
     @pytest.fixture
     def mock_model(self):
-        """Mock the TensorFlow model"""
-        mock = Mock()
-        mock.predict.return_value = [np.random.rand(256, 512, 8)]
-        return mock
+        """Stand-in for the TensorFlow model"""
+        return _StubModel()
 
     @pytest.fixture
     def service(self, mock_model):
         """Instance of the service with a mocked model"""
-        with patch(
-            "app.services.segmentation_service.tf.keras.models.load_model",
-            return_value=mock_model,
+        with patch.object(
+            tf.keras.models, "load_model", return_value=mock_model
         ):
             return SegmentationService()
 
-    @pytest.fixture
-    def sample_image_bytes(self):
-        """Test image in bytes"""
-        # create a simple test image
-        img = Image.new("RGB", (100, 100), color="red")
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format="PNG")
-        return img_bytes.getvalue()
+    # sample_image_bytes comes from the session-scoped conftest fixture:
+    # the PNG is encoded once per session instead of once per test
+
+    @pytest.fixture(scope="class")
+    def jpeg_image_bytes(self):
+        """Test JPEG image in bytes, encoded once for the class"""
+        img = Image.new("RGB", (100, 100), color="blue")
+        with io.BytesIO() as img_bytes:
+            img.save(img_bytes, format="JPEG")
+            return img_bytes.getvalue()
 
     def test_init(self, mock_model):
         """Test initialization of the service"""
         with (
             patch("os.path.exists", return_value=True),
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model",
-                return_value=mock_model,
+            patch.object(
+                tf.keras.models, "load_model", return_value=mock_model
             ),
         ):
             service = SegmentationService()
@@ -62,56 +86,73 @@ class TestSegmentationService:
         assert result.min() >= 0.0
         assert result.max() <= 1.0
 
-    def test_preprocess_image_invalid_bytes(self, service):
-        """Test image preprocessing with invalid bytes"""
-        with pytest.raises(Exception):
-            service.preprocess_image(b"invalid_image_data")
+    def test_predict_batch_splits_for_fixed_batch_backend(self, service):
+        """Test batch splitting for backends that only accept batch 1"""
 
-    def test_preprocess_image_pil_fallback(self, service):
-        """Test image preprocessing with PIL fallback"""
-        # Create a valid image but mock PIL to fail
-        img = Image.new("RGB", (100, 100), color="blue")
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format="PNG")
-        image_bytes = img_bytes.getvalue()
+        class _FixedBatchModel:
+            max_batch_size = 1
 
-        with patch("PIL.Image.open", side_effect=Exception("PIL failed")):
-            result = service.preprocess_image(image_bytes)
+            def __init__(self):
+                self.batch_sizes = []
 
-        assert isinstance(result, np.ndarray)
-        assert result.shape == (256, 512, 3)
-        assert result.dtype == np.float32
-        assert result.min() >= 0.0
-        assert result.max() <= 1.0
+            def predict(self, x):
+                self.batch_sizes.append(x.shape[0])
+                return x
 
-    def test_preprocess_image_pil_and_numpy_fallback(self, service):
-        """Test image preprocessing with PIL -> numpy -> cv2 fallback"""
-        # Create a valid image but mock both PIL and numpy to fail
-        img = Image.new("RGB", (100, 100), color="green")
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format="PNG")
-        image_bytes = img_bytes.getvalue()
+        model = _FixedBatchModel()
+        service._model = model
 
-        with (
-            patch("PIL.Image.open", side_effect=Exception("PIL failed")),
-            patch("numpy.frombuffer", side_effect=Exception("numpy failed")),
-        ):
-            with pytest.raises(Exception):
-                service.preprocess_image(image_bytes)
+        batch = np.zeros((3, 2, 2, 3), np.float32)
+        out = service.predict_batch(batch)
 
-    def test_preprocess_image_cv2_direct_success(self, service):
-        """Test image preprocessing with cv2 direct (Method 3)"""
-        # Create a valid image
-        img = Image.new("RGB", (100, 100), color="yellow")
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format="PNG")
-        image_bytes = img_bytes.getvalue()
+        # the stacked batch was fed one image at a time and reassembled
+        assert out.shape == batch.shape
+        assert model.batch_sizes == [1, 1, 1]
+
+    def test_engine_loaded_keras_model_uses_in_graph_path(
+        self, service, sample_image_bytes
+    ):
+        """Test that a startup-loaded Keras model gets the tf.function path"""
+        # 1x1 conv producing 8 logit channels: the smallest real Keras
+        # model whose output shape matches the service's expectations
+        tiny = tf.keras.Sequential(
+            [tf.keras.layers.Conv2D(8, 1, input_shape=(256, 512, 3))]
+        )
 
         with (
-            patch("PIL.Image.open", side_effect=Exception("PIL failed")),
-            patch("PIL.Image.fromarray", side_effect=Exception("PIL fromarray failed")),
+            patch.object(trt_engine, "is_engine_loaded", return_value=True),
+            patch.object(trt_engine, "get_engine", return_value=tiny),
         ):
-            result = service.preprocess_image(image_bytes)
+            assert service.model is tiny
+
+        # the concrete functions are built even though the model came
+        # from the shared engine loader, not the service's own lazy load
+        assert service._infer is not None
+        assert service._infer_batch is not None
+
+        # end to end through segment_image: argmax + palette run in-graph
+        result_bytes, stats = service.segment_image(sample_image_bytes)
+        assert result_bytes[:8] == b"\x89PNG\r\n\x1a\n"
+        assert len(stats) == 8
+
+    @pytest.mark.parametrize(
+        "method,bad_input",
+        [
+            ("preprocess_image", b"invalid_image_data"),
+            ("preprocess_image", b"\x89PNG but actually garbage"),
+            ("segment_image", b""),
+        ],
+    )
+    def test_bad_input_raises(self, service, method, bad_input):
+        """Test that undecodable inputs raise the preprocessing error"""
+        # matching on the message pins the error to the decode path
+        # instead of accepting any Exception from anywhere
+        with pytest.raises(Exception, match="Error preprocessing image"):
+            getattr(service, method)(bad_input)
+
+    def test_preprocess_image_jpeg(self, service, jpeg_image_bytes):
+        """Test image preprocessing with a JPEG input"""
+        result = service.preprocess_image(jpeg_image_bytes)
 
         assert isinstance(result, np.ndarray)
         assert result.shape == (256, 512, 3)
@@ -119,12 +160,28 @@ class TestSegmentationService:
         assert result.min() >= 0.0
         assert result.max() <= 1.0
 
+    def test_postprocess_uint8_quantized_output(self, service):
+        """Test postprocessing of a quantized uint8 prediction"""
+        # the SWAR kernel packs the 8 uint8 logits of a pixel into one
+        # uint64 word; check it against the NumPy argmax reference
+        out = np.random.default_rng(1).integers(
+            0, 256, (256, 512, 8), dtype=np.uint8
+        )
+        ids = np.empty(out.shape[:2], np.uint8)
+        color_bgr = np.empty((*out.shape[:2], 3), np.uint8)
+
+        result_bytes, stats = service._postprocess_into(out, ids, color_bgr)
+
+        np.testing.assert_array_equal(ids, np.argmax(out, -1))
+        np.testing.assert_array_equal(
+            color_bgr, service.PALETTE_BGR[np.argmax(out, -1)]
+        )
+        assert result_bytes[:8] == b"\x89PNG\r\n\x1a\n"
+        assert len(stats) == 8
+
     def test_get_segmentation_stats(self, service):
         """Test segmentation statistics calculation"""
-        # create test data
-        segmentation_ids = np.random.randint(0, 8, (256, 512))
-
-        stats = service._get_segmentation_stats(segmentation_ids)
+        stats = service._get_segmentation_stats(_SEG_IDS)
 
         assert isinstance(stats, dict)
         assert len(stats) == 8
@@ -137,41 +194,30 @@ class TestSegmentationService:
             assert isinstance(stats[class_name]["pixel_count"], int)
             assert isinstance(stats[class_name]["percentage"], float)
 
-        # check if the percentages sum to 100%
+        # class counts are exactly equal, so the sum is exactly 100%
         total_percentage = sum(stats[class_name]["percentage"] for class_name in stats)
-        assert (
-            abs(total_percentage - 100.0) < 0.1
-        )  # larger tolerance for rounding errors
+        assert abs(total_percentage - 100.0) < 1e-6
 
-    def test_segment_image(self, service, sample_image_bytes):
+    def test_segment_image(self, service, mock_model, sample_image_bytes):
         """Test complete image segmentation"""
+        # reuse the fixture's mock instead of building a second one; the
+        # patches only make the lazy model property resolve to it
         with (
             patch("os.path.exists", return_value=True),
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
+            patch.object(
+                tf.keras.models, "load_model", return_value=mock_model
+            ),
         ):
-            mock_model = Mock()
-            mock_model.predict.return_value = [np.random.rand(256, 512, 8)]
-            mock_load.return_value = mock_model
-
             result_bytes, stats = service.segment_image(sample_image_bytes)
 
             assert isinstance(result_bytes, bytes)
             assert isinstance(stats, dict)
             assert len(stats) == 8
 
-            # check if the resulting image is a valid PNG
-            try:
-                img = Image.open(io.BytesIO(result_bytes))
-                assert img.format == "PNG"
-            except Exception:
-                pytest.fail("The resulting image is not a valid PNG")
-
-    def test_segment_image_empty_bytes(self, service):
-        """Test segmentation with empty bytes"""
-        with pytest.raises(Exception):
-            service.segment_image(b"")
+            # check the PNG signature and trailing IEND chunk directly:
+            # an 8-byte compare instead of a full PIL decode
+            assert result_bytes[:8] == b"\x89PNG\r\n\x1a\n"
+            assert result_bytes[-8:] == b"IEND\xaeB`\x82"
 
     def test_palette_consistency(self, service):
         """Test palette consistency"""
@@ -187,7 +233,8 @@ class TestSegmentationService:
 
     def test_class_names_consistency(self, service):
         """Test class names consistency"""
-        expected_names = [
+        # CLASS_NAMES is a shared, immutable tuple on the class
+        expected_names = (
             "road",
             "building",
             "car",
@@ -196,85 +243,48 @@ class TestSegmentationService:
             "vegetation",
             "sky",
             "background",
-        ]
+        )
 
         assert service.CLASS_NAMES == expected_names
         assert len(service.CLASS_NAMES) == service.N_CLASSES
 
-    def test_check_model_exists_success(self, service):
-        """Test when the model file exists"""
-        with patch("os.path.exists", return_value=True):
-            # Should not raise an exception
-            service._check_model_exists()
-
-    def test_check_model_exists_file_not_found(self, service):
-        """Test when the model file does not exist"""
-        with patch("os.path.exists", return_value=False):
-            with pytest.raises(FileNotFoundError, match="Model file not found"):
+    @pytest.mark.parametrize("exists", [True, False])
+    def test_check_model_exists(self, service, exists):
+        """Test the model-file existence check for both outcomes"""
+        with patch("os.path.exists", return_value=exists):
+            if exists:
+                # Should not raise an exception
                 service._check_model_exists()
-
-    def test_check_model_exists_file_exists(self, service):
-        """Test when the model file already exists"""
-        with patch("os.path.exists", return_value=True):
-            # Should not raise an exception
-            service._check_model_exists()
-
-    def test_model_property_with_test_mode(self, service):
-        """Test model property in test mode"""
-        with (
-            patch("os.path.exists", return_value=True),  # File exists
-            patch("os.getenv", return_value="true"),  # TEST_MODE=true
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
-        ):
-            mock_load.side_effect = Exception("Model loading failed")
-
-            result = service.model
-            assert result is not None
-            assert hasattr(result, "predict")
-
-    def test_model_property_with_test_mode_and_load_failure(self, service):
-        """Test model property in test mode with load failure"""
-        with (
-            patch("os.path.exists", return_value=True),  # File exists
-            patch("os.getenv", return_value="true"),  # TEST_MODE=true
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
-        ):
-            mock_load.side_effect = Exception("Model loading failed")
-
-            result = service.model
-            assert result is not None
-            assert hasattr(result, "predict")
-
-    def test_model_property_without_test_mode(self, service):
-        """Test model property without test mode (exception raised)"""
+            else:
+                with pytest.raises(FileNotFoundError, match="Model file not found"):
+                    service._check_model_exists()
+
+    @pytest.mark.parametrize("test_mode", ["true", "false"])
+    def test_model_property_load_failure(self, service, test_mode, monkeypatch):
+        """Test model property when loading fails, with and without test mode"""
+        # setenv only touches TEST_MODE, instead of hijacking every
+        # os.getenv call through a Python-level mock
+        monkeypatch.setenv("TEST_MODE", test_mode)
         with (
             patch("os.path.exists", return_value=True),  # File exists
-            patch(
-                "os.getenv",
-                side_effect=lambda key, default=None: (
-                    "false" if key == "TEST_MODE" else default
-                ),
-            ),  # TEST_MODE=false, others default
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
+            patch.object(tf.keras.models, "load_model") as mock_load,
         ):
             mock_load.side_effect = Exception("Model loading failed")
 
-            with pytest.raises(Exception, match="Model loading failed"):
-                service.model
+            if test_mode == "true":
+                # test mode falls back to a mock model
+                result = service.model
+                assert result is not None
+                assert hasattr(result, "predict")
+            else:
+                with pytest.raises(Exception, match="Model loading failed"):
+                    service.model
 
     def test_model_property_with_model_check(self, service):
         """Test model property with model check"""
         with (
             patch.object(service, "_check_model_exists") as mock_check,
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
+            patch.object(tf.keras.models, "load_model") as mock_load,
         ):
 
             mock_model = Mock()
@@ -290,9 +300,7 @@ class TestSegmentationService:
         """Test model property without model check (file exists)"""
         with (
             patch("os.path.exists", return_value=True),
-            patch(
-                "app.services.segmentation_service.tf.keras.models.load_model"
-            ) as mock_load,
+            patch.object(tf.keras.models, "load_model") as mock_load,
         ):
 
             mock_model = Mock()